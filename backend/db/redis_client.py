@@ -0,0 +1,25 @@
+import os
+from typing import Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional: without it callers keep their in-process state
+    aioredis = None
+
+_redis = None
+
+def get_redis() -> Optional["aioredis.Redis"]:
+    """Shared async Redis client, or None when REDIS_URL is unset or redis is not installed."""
+    global _redis
+    if _redis is None:
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url and aioredis is not None:
+            _redis = aioredis.Redis.from_url(redis_url, decode_responses=True)
+    return _redis
+
+async def close_redis() -> None:
+    """Close the Redis connection pool (call on application shutdown)."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,18 @@
+-- Records a swipe and returns the user's right-swipe count in a single round-trip.
+-- Called by /api/swipe through supabase.rpc("swipe_and_count", ...); apply once in the Supabase SQL editor.
+-- p_uuid is declared uuid to match the user_item.uuid column; PostgREST casts the JSON string argument.
+
+-- Every user_item upsert (this function and the supabase_client writers) targets (uuid, item_id),
+-- which needs a unique index
+create unique index if not exists user_item_uuid_item_id_key on user_item (uuid, item_id);
+
+create or replace function swipe_and_count(p_uuid uuid, p_item_id text, p_status text)
+returns integer
+language sql
+as $$
+    insert into user_item (uuid, item_id, status)
+    values (p_uuid, p_item_id, p_status)
+    on conflict (uuid, item_id) do update set status = excluded.status;
+
+    select count(*)::int from user_item where uuid = p_uuid and status = 'swipe_right';
+$$;
@@ -1,18 +1,96 @@
 from dotenv import load_dotenv
 import os
-from supabase import create_client, Client
-from typing import List, Dict, Any, Optional
+import asyncio
+import functools
+import itertools
+import httpx
+import threading
+from cachetools import TTLCache
+from supabase import create_client, acreate_client, Client, AsyncClient
+from typing import List, Dict, Any, Optional, Tuple
 
-# Load environment variables from .env in the root folder
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
+# Load environment variables from .env in the root folder (once per process)
+if not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
+    os.environ["_DOTENV_LOADED"] = "1"
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase URL and Service Role Key must be set as environment variables.")
+# PostgREST connection pool: keep up to 5 warm keep-alive connections (the steady-state pool)
+# and allow bursts up to 10 in total, so concurrent callers reuse TLS sessions instead of
+# re-handshaking, without opening more connections than Supabase's pooler tolerates.
+POOL_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5)
+POOL_TIMEOUT = httpx.Timeout(30.0, connect=2.0)
+POOL_CONNECT_RETRIES = 2
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def _pooled_session(session: httpx.Client) -> httpx.Client:
+    """Rebuild a PostgREST session with explicit pool limits, keeping its base URL and auth headers."""
+    return httpx.Client(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=POOL_TIMEOUT,
+        transport=httpx.HTTPTransport(limits=POOL_LIMITS, retries=POOL_CONNECT_RETRIES),
+    )
+
+def _pooled_async_session(session: httpx.AsyncClient) -> httpx.AsyncClient:
+    """Async counterpart of _pooled_session() for the API's AsyncClient."""
+    return httpx.AsyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=POOL_TIMEOUT,
+        transport=httpx.AsyncHTTPTransport(limits=POOL_LIMITS, retries=POOL_CONNECT_RETRIES),
+    )
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> Client:
+    """Create the Supabase client on first use and reuse it for the life of the process."""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("Supabase URL and Service Role Key must be set as environment variables.")
+    client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    default_session = client.postgrest.session
+    client.postgrest.session = _pooled_session(default_session)
+    default_session.close()
+    return client
+
+class _LazyClient:
+    """Module-level stand-in for the Supabase client that defers construction to get_client()."""
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+supabase: Client = _LazyClient()
+
+_async_client: Optional[AsyncClient] = None
+
+async def get_async_client() -> AsyncClient:
+    """Async counterpart of get_client() for the FastAPI handlers; created on first await."""
+    global _async_client
+    if _async_client is None:
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            raise ValueError("Supabase URL and Service Role Key must be set as environment variables.")
+        client = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+        default_session = client.postgrest.session
+        client.postgrest.session = _pooled_async_session(default_session)
+        await default_session.aclose()
+        _async_client = client
+    return _async_client
+
+async def close_async_client() -> None:
+    """Close the async client's pooled connections (call on application shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.postgrest.aclose()
+        _async_client = None
+
+# Rows per bulk upsert request: keeps each PostgREST body well under the request size limit
+UPSERT_BATCH_SIZE = 500
+
+# Ids per .in_() lookup: the filter travels in the URL query string, so bound its length
+ID_BATCH_SIZE = 200
+
+def _batches(rows: List[Any], size: int = UPSERT_BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
 
 # --- USER PROFILE ---
 def upsert_user_profile(profile: Dict[str, Any]) -> Dict:
@@ -27,24 +105,138 @@ def set_user_profile_complete(uuid: str) -> Dict:
     resp = supabase.table("user_profile").update({"complete": True}).eq("uuid", uuid).execute()
     return resp.data
 
+# The item and user_item caches below are per process, and a write only invalidates the worker
+# that made it. They therefore assume a single worker: when REDIS_URL is set (the multi-worker
+# deployment, see db/redis_client.py) they are bypassed so no worker serves rows another changed.
+LOCAL_CACHES_ENABLED = not os.getenv("REDIS_URL")
+
 # --- ITEM ---
-def upsert_item(item: Dict[str, Any]) -> Dict:
-    resp = supabase.table("item").upsert(item).execute()
-    return resp.data
+# Item rows are shared by every user who was served them and only change when re-upserted,
+# so candidate polls reuse recently fetched rows; upserts in this process drop stale entries.
+_items_cache = TTLCache(maxsize=50_000, ttl=300)
+_items_cache_lock = threading.Lock()
+
+def _split_cached_items(item_ids: List[str]):
+    """Return ({item_id: row} already cached, [ids still to fetch])."""
+    if not LOCAL_CACHES_ENABLED:
+        return {}, list(item_ids)
+    with _items_cache_lock:
+        cached = {item_id: _items_cache[item_id] for item_id in item_ids if item_id in _items_cache}
+    return cached, [item_id for item_id in item_ids if item_id not in cached]
+
+def _cache_items(items: List[Dict]) -> None:
+    if not LOCAL_CACHES_ENABLED:
+        return
+    with _items_cache_lock:
+        for item in items:
+            _items_cache[item["item_id"]] = item
+
+def _invalidate_items(items: List[Dict[str, Any]]) -> None:
+    with _items_cache_lock:
+        for item in items:
+            _items_cache.pop(item.get("item_id"), None)
+
+def upsert_items_bulk(items: List[Dict[str, Any]]) -> int:
+    for batch in _batches(items):
+        supabase.table("item").upsert(batch, returning="minimal").execute()
+    _invalidate_items(items)
+    return len(items)
 
 def get_item(item_id: str) -> Optional[Dict]:
     resp = supabase.table("item").select("*").eq("item_id", item_id).single().execute()
     return resp.data if resp.data else None
 
 # --- USER ITEM ---
-def upsert_user_item(user_item: Dict[str, Any]) -> Dict:
-    resp = supabase.table("user_item").upsert(user_item).execute()
-    return resp.data
+# Short-lived per-user cache of user_item rows: absorbs repeated candidate polls, and every
+# user_item write in this process drops the affected users so they are re-read fresh.
+_user_items_cache = TTLCache(maxsize=4096, ttl=20)
+_user_items_cache_lock = threading.Lock()
+# Each invalidation gives the user a new generation; a read stores its rows only if the generation
+# it started under is still current, so a read that raced a write cannot cache pre-write rows.
+# Entries need only outlive an in-flight read.
+_user_items_generations = TTLCache(maxsize=65_536, ttl=60)
+_user_items_generation_counter = itertools.count(1)
+
+def _cached_user_items(uuid: str) -> Tuple[Optional[List[Dict]], Optional[int]]:
+    """Return (cached rows or None, the generation to pass to _cache_user_items after a fetch)."""
+    if not LOCAL_CACHES_ENABLED:
+        return None, None
+    with _user_items_cache_lock:
+        return _user_items_cache.get(uuid), _user_items_generations.get(uuid)
+
+def _cache_user_items(uuid: str, user_items: List[Dict], generation: Optional[int]) -> None:
+    if not LOCAL_CACHES_ENABLED:
+        return
+    with _user_items_cache_lock:
+        if _user_items_generations.get(uuid) == generation:
+            _user_items_cache[uuid] = user_items
 
-def get_user_items(uuid: str) -> List[Dict]:
-    resp = supabase.table("user_item").select("*").eq("uuid", uuid).execute()
-    return resp.data if resp.data else []
+def _invalidate_user_items(*uuids: str) -> None:
+    with _user_items_cache_lock:
+        for uuid in uuids:
+            _user_items_cache.pop(uuid, None)
+            _user_items_generations[uuid] = next(_user_items_generation_counter)
+
+def upsert_user_items_bulk(user_items: List[Dict[str, Any]]) -> int:
+    for batch in _batches(user_items):
+        supabase.table("user_item").upsert(batch, on_conflict="uuid,item_id", returning="minimal").execute()
+    _invalidate_user_items(*{row["uuid"] for row in user_items})
+    return len(user_items)
 
 def update_user_item_status(uuid: str, item_id: str, status: str) -> Dict:
-    resp = supabase.table("user_item").update({"status": status}).eq("uuid", uuid).eq("item_id", item_id).execute()
-    return resp.data 
\ No newline at end of file
+    # Single upsert on the (uuid, item_id) unique key: updates the row, or creates it if missing
+    resp = supabase.table("user_item").upsert({"uuid": uuid, "item_id": item_id, "status": status}, on_conflict="uuid,item_id").execute()
+    _invalidate_user_items(uuid)
+    return resp.data
+
+# --- ASYNC VARIANTS (used by the Hunter Agent API handlers) ---
+async def aset_user_profile_complete(uuid: str) -> Dict:
+    client = await get_async_client()
+    resp = await client.table("user_profile").update({"complete": True}).eq("uuid", uuid).execute()
+    return resp.data
+
+async def aupsert_items_bulk(items: List[Dict[str, Any]]) -> int:
+    client = await get_async_client()
+    for batch in _batches(items):
+        await client.table("item").upsert(batch, returning="minimal").execute()
+    _invalidate_items(items)
+    return len(items)
+
+async def aget_items_bulk(item_ids: List[str]) -> List[Dict]:
+    # Only ids missing from the item cache are queried; a repeat poll is served without a round-trip
+    cached, missing = _split_cached_items(item_ids)
+    if not missing:
+        return list(cached.values())
+    client = await get_async_client()
+    # Usually a single request; larger id lists are split and fetched concurrently
+    responses = await asyncio.gather(*(
+        client.table("item").select("*").in_("item_id", batch).execute()
+        for batch in _batches(missing, ID_BATCH_SIZE)
+    ))
+    fetched = [item for resp in responses for item in (resp.data or [])]
+    _cache_items(fetched)
+    return list(cached.values()) + fetched
+
+async def aupsert_user_items_bulk(user_items: List[Dict[str, Any]]) -> int:
+    client = await get_async_client()
+    for batch in _batches(user_items):
+        await client.table("user_item").upsert(batch, on_conflict="uuid,item_id", returning="minimal").execute()
+    _invalidate_user_items(*{row["uuid"] for row in user_items})
+    return len(user_items)
+
+async def aget_user_items(uuid: str) -> List[Dict]:
+    cached, generation = _cached_user_items(uuid)
+    if cached is not None:
+        return cached
+    client = await get_async_client()
+    resp = await client.table("user_item").select("*").eq("uuid", uuid).execute()
+    user_items = resp.data if resp.data else []
+    _cache_user_items(uuid, user_items, generation)
+    return user_items
+
+async def aswipe_and_count(uuid: str, item_id: str, status: str) -> int:
+    """Upsert a swipe and return the user's right-swipe count in one RPC (see db/sql/swipe_and_count.sql)."""
+    client = await get_async_client()
+    resp = await client.rpc("swipe_and_count", {"p_uuid": uuid, "p_item_id": item_id, "p_status": status}).execute()
+    _invalidate_user_items(uuid)
+    return resp.data
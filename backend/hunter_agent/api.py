@@ -1,31 +1,119 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
-from typing import List
-from backend.db.supabase_client import get_user_items, get_item, update_user_item_status, upsert_item, upsert_user_item, set_user_profile_complete
+from postgrest.exceptions import APIError
+from typing import List, Dict, Optional
+from backend.db.supabase_client import get_async_client, close_async_client, aget_user_items, aget_items_bulk, aswipe_and_count, aupsert_items_bulk, aupsert_user_items_bulk, aset_user_profile_complete
+from backend.db.redis_client import get_redis, close_redis
 from backend.hunter_agent.retriever import load_user_profile, retrieve_top_candidates
 from backend.hunter_agent.embedding import generate_user_embedding
 from backend.hunter_agent.art_embedding import batch_generate_embeddings
 import numpy as np
+import orjson
+import os
+import logging
 import traceback
 import hashlib
+import functools
+import itertools
+import threading
+import asyncio
+import requests
+from contextlib import asynccontextmanager
+from cachetools import TTLCache
 
-# In-memory status store (for demo; replace with persistent store for production)
-generation_status = {}
+# INFO by default so per-request debug output (headers, call stacks) is never built in production;
+# set LOG_LEVEL=DEBUG to see it. basicConfig is a no-op if the host process already configured logging.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
 
+# Content domains queried for every user, in the order candidates are merged
+DOMAINS = ("movies", "books", "music", "art", "poetry", "podcasts", "musicals")
+
+GENERATION_STATUS_TTL = 3600
+
+# Generation status lives in Redis when REDIS_URL is set, so every uvicorn worker sees the same
+# value. Without Redis it falls back to this in-process store (single worker only).
+# Entries expire after an hour so the store stays bounded; the lock keeps it safe from worker threads too.
+generation_status = TTLCache(maxsize=10_000, ttl=GENERATION_STATUS_TTL)
+_generation_status_lock = threading.Lock()
+
+# With Redis, recently read statuses are held locally for a second to absorb polling bursts
+_generation_status_reads = TTLCache(maxsize=10_000, ttl=1)
+
+def _generation_status_key(user_uuid: str) -> str:
+    return f"genstatus:{user_uuid}"
+
+async def set_generation_status(user_uuid: str, status: str) -> None:
+    redis = get_redis()
+    if redis is None:
+        with _generation_status_lock:
+            generation_status[user_uuid] = status
+        return
+    await redis.set(_generation_status_key(user_uuid), status, ex=GENERATION_STATUS_TTL)
+    with _generation_status_lock:
+        _generation_status_reads[user_uuid] = status
+
+async def read_generation_status(user_uuid: str) -> str:
+    redis = get_redis()
+    with _generation_status_lock:
+        store = generation_status if redis is None else _generation_status_reads
+        status = store.get(user_uuid)
+    if status is not None or redis is None:
+        return status or "pending"
+    status = await redis.get(_generation_status_key(user_uuid)) or "pending"
+    with _generation_status_lock:
+        _generation_status_reads[user_uuid] = status
+    return status
+
+# Each user's latest right-swipe count, so get_candidates can answer "training complete" without
+# reading the user's items. Kept in Redis alongside generation status when available.
+_right_swipe_counts = TTLCache(maxsize=10_000, ttl=GENERATION_STATUS_TTL)
+_right_swipe_counts_lock = threading.Lock()
+
+def _right_swipes_key(user_uuid: str) -> str:
+    return f"rswipes:{user_uuid}"
+
+async def set_right_swipe_count(user_uuid: str, count: int) -> None:
+    redis = get_redis()
+    if redis is None:
+        with _right_swipe_counts_lock:
+            _right_swipe_counts[user_uuid] = count
+        return
+    await redis.set(_right_swipes_key(user_uuid), count, ex=GENERATION_STATUS_TTL)
+
+async def read_right_swipe_count(user_uuid: str) -> Optional[int]:
+    """The last known right-swipe count, or None if it has not been recorded yet."""
+    redis = get_redis()
+    if redis is None:
+        with _right_swipe_counts_lock:
+            return _right_swipe_counts.get(user_uuid)
+    count = await redis.get(_right_swipes_key(user_uuid))
+    return int(count) if count is not None else None
+
+@functools.lru_cache(maxsize=100_000)
 def generate_item_id(url: str) -> str:
-    """Generate a consistent item_id from a URL using SHA-256."""
-    # Use SHA-256 to generate a hash of the URL
-    hash_object = hashlib.sha256(url.encode())
-    # Take first 12 characters of the hex digest for a shorter but still unique ID
-    return hash_object.hexdigest()[:12]
+    """Generate a consistent item_id from a URL using SHA-256.
 
-def count_right_swipes(user_uuid: str) -> int:
-    """Count how many right swipes a user has made."""
-    user_items = get_user_items(user_uuid)
-    return sum(1 for item in user_items if item["status"] == "swipe_right")
+    Memoized per process (bounded at 100k URLs): the same URLs recur across users'
+    candidate batches and swipe requests, and a string key is cheap to look up.
+    """
+    # The first 6 digest bytes as hex equal the first 12 hex characters of the digest,
+    # so IDs match existing rows without formatting the full 64-character hex string
+    return hashlib.sha256(url.encode()).digest()[:6].hex()
 
-app = FastAPI(title="Hunter Agent API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the async client before serving so concurrent first requests share one connection pool
+    await get_async_client()
+    yield
+    await close_async_client()
+    await close_redis()
+
+# orjson serializes responses several times faster than the stdlib encoder
+app = FastAPI(title="Hunter Agent API", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,81 +122,164 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Candidate lists carry long descriptions and URLs; compress anything beyond a small payload
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
 class SwipeRequest(BaseModel):
     user_uuid: str
     item_id: str
     status: str  # 'swipe_left', 'swipe_right', 'shortlisted', 'confirmed', etc.
 
+def _etag_response(request: Request, payload: Dict) -> Response:
+    """Serialize once and tag the body; a poll whose If-None-Match still matches gets an empty 304."""
+    body = orjson.dumps(payload)
+    opaque_tag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    # Weak, since the same tag covers the gzip and identity encodings of this body
+    etag = f"W/{opaque_tag}"
+    # no-cache: clients may store the body but must revalidate, which is what sends If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # If-None-Match uses weak comparison (RFC 7232): a proxy that compresses the body turns the
+    # tag into W/"...", which must still match
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or opaque_tag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/candidates/{user_uuid}")
-def get_candidates(user_uuid: str):
-    # First check if user has reached 30 right swipes
-    right_swipes = count_right_swipes(user_uuid)
+async def get_candidates(user_uuid: str, request: Request):
+    # Users who already finished training are answered from the stored counter alone
+    known_right_swipes = await read_right_swipe_count(user_uuid)
+    if known_right_swipes is not None and known_right_swipes >= 30:
+        return ORJSONResponse({"candidates": [], "training_complete": True})
+
+    # Fetch the user's items once and derive the swipe count and the candidate list in one pass
+    user_items = await aget_user_items(user_uuid)
+    right_swipes = 0
+    candidate_ids = []
+    for ui in user_items:
+        status = ui["status"]
+        if status == "swipe_right":
+            right_swipes += 1
+        elif status == "candidate":
+            candidate_ids.append(ui["item_id"])
+    # Rebuild the counter from the rows on a miss, or correct it if the rows disagree
+    if known_right_swipes != right_swipes:
+        await set_right_swipe_count(user_uuid, right_swipes)
+    # Stop once the user has reached 30 right swipes
     if right_swipes >= 30:
-        return {"candidates": [], "training_complete": True}
+        return ORJSONResponse({"candidates": [], "training_complete": True})
 
-    user_items = get_user_items(user_uuid)
-    candidate_ids = [ui["item_id"] for ui in user_items if ui["status"] == "candidate"]
-    candidates = []
-    for item_id in candidate_ids:
-        item = get_item(item_id)
-        if item:
-            candidates.append(item)
-    return {"candidates": candidates, "training_complete": False}
+    # One query for all candidate items, then restore the user_item order
+    items_by_id = {item["item_id"]: item for item in await aget_items_bulk(candidate_ids)}
+    candidates = [items_by_id[item_id] for item_id in candidate_ids if item_id in items_by_id]
+    # Returning the response directly skips FastAPI's jsonable_encoder walk over every item row;
+    # the rows are plain JSON from PostgREST, which orjson serializes as-is
+    return _etag_response(request, {"candidates": candidates, "training_complete": False})
 
 @app.post("/api/swipe")
-def swipe(req: SwipeRequest):
+async def swipe(req: SwipeRequest):
     # Convert URL to item_id if a URL was passed
     item_id = req.item_id
     if item_id.startswith('http'):
         item_id = generate_item_id(item_id)
     
-    # Update the user_item status
-    result = update_user_item_status(req.user_uuid, item_id, req.status)
-    if not result:
+    # Update the user_item status and get the new right-swipe count in one round-trip
+    try:
+        right_swipes = await aswipe_and_count(req.user_uuid, item_id, req.status)
+    except APIError as e:
+        logger.error("swipe_and_count failed for UUID %s, item %s: %s", req.user_uuid, item_id, e)
         raise HTTPException(status_code=500, detail="Failed to update swipe status.")
+    # The RPC's count is authoritative whatever the new status, so it also corrects the counter
+    await set_right_swipe_count(req.user_uuid, right_swipes)
     
     # Check if we've reached 30 right swipes
-    if req.status == "swipe_right":
-        right_swipes = count_right_swipes(req.user_uuid)
-        if right_swipes >= 30:
-            return {"success": True, "training_complete": True}
-    
-    return {"success": True, "training_complete": False}
+    training_complete = req.status == "swipe_right" and right_swipes >= 30
+    return ORJSONResponse({"success": True, "training_complete": training_complete})
 
 @app.get("/api/generation_status/{user_uuid}")
-def get_generation_status(user_uuid: str):
-    status = generation_status.get(user_uuid, "pending")
+async def get_generation_status(user_uuid: str):
+    status = await read_generation_status(user_uuid)
     return {"status": status}
 
+@app.get("/health")
+async def health():
+    if get_redis() is not None:
+        return {"status": "ok", "generation_status_backend": "redis"}
+    with _generation_status_lock:
+        tracked = len(generation_status)
+    return {"status": "ok", "generation_status_backend": "memory", "generation_status_entries": tracked}
+
 @app.post("/api/generate_candidates/{user_uuid}")
-def generate_candidates(user_uuid: str, request: Request):
-    print(f"[INFO] Hunter Agent received candidate generation trigger for UUID: {user_uuid}")
-    print(f"[DEBUG] Request method: {request.method}, headers: {dict(request.headers)}")
-    print(f"[DEBUG] Call stack:\n{''.join(traceback.format_stack())}")
-    generation_status[user_uuid] = "pending"
+async def generate_candidates(user_uuid: str, request: Request, background_tasks: BackgroundTasks):
+    logger.info("Hunter Agent received candidate generation trigger for UUID: %s", user_uuid)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request method: %s, headers: %s", request.method, dict(request.headers))
+        logger.debug("Call stack:\n%s", ''.join(traceback.format_stack()))
+    await set_generation_status(user_uuid, "pending")
     # Load user profile from Supabase
-    user_profile = load_user_profile(user_uuid)
+    user_profile = await asyncio.to_thread(load_user_profile, user_uuid)
     if not user_profile or user_profile.get("uuid") != user_uuid:
-        print(f"[WARN] No user profile found for UUID: {user_uuid}")
-        generation_status[user_uuid] = "pending"
+        logger.warning("No user profile found for UUID: %s", user_uuid)
+        await set_generation_status(user_uuid, "pending")
         return {"error": "User profile not found or does not match."}
-    user_embedding = generate_user_embedding(user_uuid)
-    # Retrieve candidates from all domains
-    movie_candidates = retrieve_top_candidates("movies", user_embedding, user_profile)
-    book_candidates = retrieve_top_candidates("books", user_embedding, user_profile)
-    music_candidates = retrieve_top_candidates("music", user_embedding, user_profile)
-    art_candidates = retrieve_top_candidates("art", user_embedding, user_profile)
-    poetry_candidates = retrieve_top_candidates("poetry", user_embedding, user_profile)
-    podcast_candidates = retrieve_top_candidates("podcasts", user_embedding, user_profile)
-    musical_candidates = retrieve_top_candidates("musicals", user_embedding, user_profile)
-    # Merge and enrich
-    top_candidates = movie_candidates + book_candidates + music_candidates + art_candidates + poetry_candidates + podcast_candidates + musical_candidates
-    top_candidates = batch_generate_embeddings(top_candidates)
-    # Log to Supabase
-    for candidate in top_candidates:
-        item_id = generate_item_id(candidate.get("source_url", ""))
-        item_data = {
+    # Retrieval, embedding and the upserts run after the response is sent; the client
+    # polls /api/generation_status until the task marks the user complete
+    background_tasks.add_task(run_candidate_generation, user_uuid, user_profile)
+    return {"success": True, "status": "queued"}
+
+# requests.Session is not guaranteed thread-safe, so each worker thread keeps its own. The pool's
+# threads are reused, so their sessions keep keep-alive connections (e.g. to SerpAPI) across runs.
+_thread_sessions = threading.local()
+
+def _retrieve_domain(domain: str, user_embedding: List[float], user_profile: Dict) -> List[Dict]:
+    session = getattr(_thread_sessions, "session", None)
+    if session is None:
+        session = _thread_sessions.session = requests.Session()
+    return retrieve_top_candidates(domain, user_embedding, user_profile, session)
+
+async def run_candidate_generation(user_uuid: str, user_profile: Dict) -> None:
+    """Generate, embed and store a user's candidates, then mark their generation complete."""
+    # The trigger has already answered "queued", so a failure here must reach the client through
+    # the status it polls; otherwise it would wait on "pending" forever
+    try:
+        await _generate_and_store_candidates(user_uuid, user_profile)
+    except Exception:
+        logger.exception("Candidate generation failed for UUID: %s", user_uuid)
+        await set_generation_status(user_uuid, "error")
+
+async def _generate_and_store_candidates(user_uuid: str, user_profile: Dict) -> None:
+    # Reuse the profile loaded by the trigger rather than letting the embedder fetch it again
+    user_embedding = await asyncio.to_thread(generate_user_embedding, user_profile)
+    # Retrieve candidates from all domains concurrently; the retrievers are blocking HTTP clients,
+    # so each runs in a worker thread while the event loop keeps serving other requests.
+    results = await asyncio.gather(*(
+        asyncio.to_thread(_retrieve_domain, domain, user_embedding, user_profile)
+        for domain in DOMAINS
+    ), return_exceptions=True)
+    # A failing source (timeout, connection error) costs only its own domain, not the whole batch
+    domain_results = []
+    for domain, result in zip(DOMAINS, results):
+        if isinstance(result, Exception):
+            logger.warning("Retrieval failed for domain %s (UUID: %s): %r", domain, user_uuid, result)
+            continue
+        domain_results.append(result)
+    # With every source down there is nothing to store; fail so the client sees "error"
+    # instead of a completed generation with no candidates
+    if not domain_results:
+        raise RuntimeError(f"Retrieval failed for every domain (UUID: {user_uuid})")
+    # Merge in a single pass, keeping the first candidate seen for each URL so duplicates
+    # across domains are neither embedded nor upserted twice
+    unique_candidates = {}
+    for candidate in itertools.chain.from_iterable(domain_results):
+        unique_candidates.setdefault(candidate.get("source_url", ""), candidate)
+    top_candidates = list(unique_candidates.values())
+    top_candidates = await asyncio.to_thread(batch_generate_embeddings, top_candidates)
+    # Log to Supabase in two bulk upserts instead of two round-trips per candidate.
+    # A single upsert statement cannot touch the same row twice, so key by item_id.
+    item_ids = [generate_item_id(candidate.get("source_url", "")) for candidate in top_candidates]
+    items_payload = {}
+    for candidate, item_id in zip(top_candidates, item_ids):
+        items_payload[item_id] = {
             "item_id": item_id,
             "item_name": candidate.get("title", ""),
             "description": candidate.get("description", ""),
@@ -119,14 +290,13 @@ def generate_candidates(user_uuid: str, request: Request):
             "release_date": candidate.get("release_date", ""),
             "metadata": candidate.get("metadata", {})
         }
-        upsert_item(item_data)
-        user_item_data = {
-            "uuid": user_uuid,
-            "item_id": item_id,
-            "status": "candidate"
-        }
-        upsert_user_item(user_item_data)
-    generation_status[user_uuid] = "complete"
-    set_user_profile_complete(user_uuid)
-    print(f"[INFO] Hunter Agent finished candidate generation for UUID: {user_uuid} ({len(top_candidates)} candidates)")
-    return {"success": True, "candidates_generated": len(top_candidates)} 
\ No newline at end of file
+    user_items_payload = [
+        {"uuid": user_uuid, "item_id": item_id, "status": "candidate"}
+        for item_id in items_payload
+    ]
+    await aupsert_items_bulk(list(items_payload.values()))
+    await aupsert_user_items_bulk(user_items_payload)
+    await aset_user_profile_complete(user_uuid)
+    # Marked complete only once every write has succeeded
+    await set_generation_status(user_uuid, "complete")
+    logger.info("Hunter Agent finished candidate generation for UUID: %s (%d candidates)", user_uuid, len(top_candidates)) 
@@ -23,5 +23,7 @@ if __name__ == "__main__":
         "backend.hunter_agent.api:app",
         host="0.0.0.0",
         port=port,
+        # uvicorn's default loop setting already uses uvloop when it is installed;
+        # the uvicorn[standard] requirement is what brings it in
         reload=True
     ) 
\ No newline at end of file
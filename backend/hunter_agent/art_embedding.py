@@ -1,17 +1,150 @@
 # tools/embedding.py
 import openai
 import os
-from typing import List, Dict
+import hashlib
+import logging
+import sqlite3
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Optional
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+logger = logging.getLogger(__name__)
 
-def generate_text_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
-    response = openai.embeddings.create(
-        model=model,
-        input=text
-    )
-    return response.data[0].embedding
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 256  # The endpoint accepts up to 2048 inputs per request
+
+
+def _batch_embed(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """Embed texts with one request per chunk of EMBEDDING_BATCH_SIZE, preserving input order."""
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        chunk = texts[start:start + EMBEDDING_BATCH_SIZE]
+        # Transient failures are retried with backoff by the openai client itself
+        response = openai.embeddings.create(model=model, input=chunk)
+        # Results carry their input index; sort in case they come back out of order
+        embeddings.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+    return embeddings
+
+
+def normalize_embedding(embedding: List[float]) -> List[float]:
+    """Scale an embedding to unit length so cosine similarity reduces to a dot product."""
+    vec = np.asarray(embedding, dtype=float)
+    return (vec / (np.linalg.norm(vec) + 1e-12)).tolist()
+
+
+# Unit-length embeddings of item text, kept as compact read-only float32 arrays. Candidates recur
+# across generations (the same works surface for similar profiles), and identical text always
+# yields the same vector, so repeats skip the API call. Guarded by a lock because the API embeds
+# from worker threads.
+MAX_CACHED_ITEM_EMBEDDINGS = 4096
+_item_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_item_embeddings_lock = threading.Lock()
+
+
+# Embeddings can also persist on disk, keyed by a hash of model and text, so unchanged items are
+# not re-embedded across runs or processes. Opt-in: set EMBEDDING_CACHE_PATH to a SQLite file.
+# The table keeps the most recently written MAX_DISK_CACHED_EMBEDDINGS rows (~6 KB each).
+EMBEDDING_CACHE_PATH = os.path.expanduser(os.getenv("EMBEDDING_CACHE_PATH", ""))
+MAX_DISK_CACHED_EMBEDDINGS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "100000"))
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def _embedding_cache_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _get_disk_cache() -> Optional[sqlite3.Connection]:
+    """Shared connection to the on-disk embedding cache, or None when it is disabled or unusable."""
+    global _disk_cache, EMBEDDING_CACHE_PATH
+    if _disk_cache is None and EMBEDDING_CACHE_PATH:
+        try:
+            os.makedirs(os.path.dirname(EMBEDDING_CACHE_PATH) or ".", exist_ok=True)
+            conn = sqlite3.connect(EMBEDDING_CACHE_PATH, timeout=5, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS emb (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+            _disk_cache = conn
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Embedding disk cache unavailable (%s); continuing without it", e)
+            EMBEDDING_CACHE_PATH = ""  # Don't retry on every batch
+    return _disk_cache
+
+
+def _read_disk_embeddings(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Cached vectors for whichever texts are on disk; any SQLite error reads as a miss."""
+    with _disk_cache_lock:
+        conn = _get_disk_cache()
+        if conn is None:
+            return {}
+        keys = {_embedding_cache_key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        try:
+            for start in range(0, len(key_list), 500):  # Stay under SQLite's bound-parameter limit
+                chunk = key_list[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vec FROM emb WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                for key, blob in rows:
+                    found[keys[key]] = np.frombuffer(blob, dtype=np.float32)  # Read-only view
+        except sqlite3.Error as e:
+            # e.g. "database is locked" while another worker writes; the API fills the gap
+            logger.warning("Embedding disk cache read failed (%s); embedding without it", e)
+            return {}
+        return found
+
+
+def _write_disk_embeddings(vectors: Dict[str, np.ndarray]) -> None:
+    """Store new vectors and trim the oldest rows past the cap; best-effort, errors are only logged."""
+    with _disk_cache_lock:
+        conn = _get_disk_cache()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO emb (key, vec) VALUES (?, ?)",
+                    [(_embedding_cache_key(text), vec.tobytes()) for text, vec in vectors.items()])
+                # INSERT OR REPLACE assigns a fresh rowid, so rowid order is write order
+                conn.execute(
+                    "DELETE FROM emb WHERE rowid <= (SELECT rowid FROM emb ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                    (MAX_DISK_CACHED_EMBEDDINGS,))
+        except sqlite3.Error as e:
+            logger.warning("Embedding disk cache write failed (%s); vectors not persisted", e)
+
+
+def _cached_item_embeddings(texts: List[str]) -> List[np.ndarray]:
+    """Embeddings for texts, calling the API in batches only for those cached neither in memory nor on disk."""
+    with _item_embeddings_lock:
+        found = {}
+        for text in texts:
+            vec = _item_embeddings.get(text)
+            if vec is not None:
+                _item_embeddings.move_to_end(text)
+                found[text] = vec
+    # Identical texts (re-used descriptions, near-duplicate items) are looked up and embedded once
+    missing = list(dict.fromkeys(text for text in texts if text not in found))
+    if missing:
+        fetched = _read_disk_embeddings(missing)
+        to_embed = [text for text in missing if text not in fetched]
+        if to_embed:
+            embedded = {}
+            for text, embedding in zip(to_embed, _batch_embed(to_embed)):
+                vec = np.asarray(normalize_embedding(embedding), dtype=np.float32)
+                vec.setflags(write=False)
+                embedded[text] = vec
+            _write_disk_embeddings(embedded)
+            fetched.update(embedded)
+        with _item_embeddings_lock:
+            for text, vec in fetched.items():
+                found[text] = vec
+                _item_embeddings[text] = vec
+                _item_embeddings.move_to_end(text)
+            while len(_item_embeddings) > MAX_CACHED_ITEM_EMBEDDINGS:
+                _item_embeddings.popitem(last=False)
+    return [found[text] for text in texts]
 
 
 def make_embedding_text(item: dict) -> str:
@@ -33,14 +166,26 @@ def make_embedding_text(item: dict) -> str:
 def batch_generate_embeddings(candidates: List[Dict]) -> List[Dict]:
     """
     Converts candidate items into embedding-enriched data using all available fields.
+    Items that already carry an embedding are passed through; only the rest are embedded.
+    The embedding is set on the given dicts in place (callers hand over lists they own).
     """
-    enriched_candidates = []
+    # Gather every text first so the uncached ones go to the API in a few batched requests
+    pending = []
+    texts = []
     for item in candidates:
+        if item.get("embedding") is not None:
+            pending.append((item, None))
+            continue
         text = make_embedding_text(item)
         if not text:
             continue
-        embedding = generate_text_embedding(text)
-        enriched_item = item.copy()
-        enriched_item["embedding"] = embedding
-        enriched_candidates.append(enriched_item)
-    return enriched_candidates 
\ No newline at end of file
+        pending.append((item, len(texts)))
+        texts.append(text)
+    vectors = _cached_item_embeddings(texts) if texts else []
+
+    enriched_candidates = []
+    for item, index in pending:
+        if index is not None:
+            item["embedding"] = vectors[index].tolist()
+        enriched_candidates.append(item)
+    return enriched_candidates
@@ -1,9 +1,11 @@
 # tools/embedding.py
-import json
+import orjson
 import openai
 import os
+import functools
 from dotenv import load_dotenv
 from backend.hunter_agent.retriever import load_user_profile
+from backend.hunter_agent.art_embedding import normalize_embedding
 import numpy as np
 
 # Load environment variables from .env in the root folder
@@ -14,8 +16,8 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 openai.api_type = "openai"
 
 def extract_profile_text(json_path):
-    with open(json_path, "r") as f:
-        data = json.load(f)
+    with open(json_path, "rb") as f:
+        data = orjson.loads(f.read())
 
     # The 'data' object is the user profile itself.
     profile_text = ""
@@ -71,14 +73,18 @@ def generate_user_embedding(user_uuid_or_profile):
     else:
         profile = load_user_profile(user_uuid_or_profile)
     profile_text = extract_profile_text_from_dict(profile)
-    
+    return list(_embed_profile_text(profile_text))
+
+@functools.lru_cache(maxsize=512)
+def _embed_profile_text(profile_text: str) -> tuple:
+    """Embed profile text, memoized: the text is the model's only input, so an edited profile misses."""
     response = openai.embeddings.create(
         input=profile_text,
         model="text-embedding-ada-002"
     )
     
-    embedding = response.data[0].embedding
-    return embedding
+    # Stored unit-length, like candidate embeddings, so scoring is a plain dot product
+    return tuple(normalize_embedding(response.data[0].embedding))
 
 # For demonstration, return a dummy embedding (replace with real model call)
 def generate_user_embedding_dummy(user_uuid_or_profile):
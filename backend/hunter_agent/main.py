@@ -10,9 +10,10 @@ from retriever import retrieve_top_candidates, load_user_profile, save_user_prof
 from reranker import update_user_embedding
 from formatter import format_for_user
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import json
-from backend.db.supabase_client import upsert_item, upsert_user_item, update_user_item_status
+import orjson
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from backend.db.supabase_client import upsert_items_bulk, upsert_user_items_bulk, update_user_item_status
 
 # Step 1: Load user profile and generate user embedding
 # Updated path to read from user_profiles.json in art_recommender folder
@@ -26,23 +27,32 @@ print("--- Initial user profile embedding generated. ---")
 
 # Step 2: Retrieve an initial pool of candidates from each domain
 print("--- Retrieving initial candidates from various domains... ---")
-movie_candidates = retrieve_top_candidates("movies", user_embedding, user_profile)
-book_candidates = retrieve_top_candidates("books", user_embedding, user_profile)
-music_candidates = retrieve_top_candidates("music", user_embedding, user_profile)
-art_candidates = retrieve_top_candidates("art", user_embedding, user_profile)
-poetry_candidates = retrieve_top_candidates("poetry", user_embedding, user_profile)
-podcast_candidates = retrieve_top_candidates("podcasts", user_embedding, user_profile)
-musical_candidates = retrieve_top_candidates("musicals", user_embedding, user_profile)
+# The domain lookups are independent HTTP calls, so run them concurrently
+domains = ("movies", "books", "music", "art", "poetry", "podcasts", "musicals")
+with ThreadPoolExecutor(max_workers=len(domains)) as executor:
+    futures = [executor.submit(retrieve_top_candidates, domain, user_embedding, user_profile) for domain in domains]
+    domain_candidates = []
+    # Collect in domain order; a failing source only drops its own domain
+    for domain, future in zip(domains, futures):
+        try:
+            domain_candidates.append(future.result())
+        except Exception as e:
+            print(f"--- Could not retrieve {domain} candidates: {e} ---")
 
 # Step 3: Merge and enrich the pool with embeddings
 # 拼接所有候选项，批量生成 embedding（包含 title/description/creator/category/release_date/metadata 等）
-top_candidates = movie_candidates + book_candidates + music_candidates + art_candidates + poetry_candidates + podcast_candidates + musical_candidates
-top_candidates = batch_generate_embeddings(top_candidates)
+# Keep the first candidate for each URL (the CLI's item_id) so duplicates across domains are embedded once
+unique_candidates = {}
+for candidate in itertools.chain.from_iterable(domain_candidates):
+    unique_candidates.setdefault(candidate.get("source_url", ""), candidate)
+top_candidates = batch_generate_embeddings(list(unique_candidates.values()))
 print(f"--- Pool of {len(top_candidates)} candidates ready for interaction. ---")
 
 # --- Supabase: Log all candidates as items and user_item (status='candidate') ---
+# Two bulk upserts; candidates are already unique by item_id, and one upsert cannot touch a row twice
+items_payload = {}
 for candidate in top_candidates:
-    item_data = {
+    items_payload[candidate.get("source_url", "")] = {
         "item_id": candidate.get("source_url", ""),
         "item_name": candidate.get("title", ""),
         "description": candidate.get("description", ""),
@@ -53,13 +63,11 @@ for candidate in top_candidates:
         "release_date": candidate.get("release_date", ""),
         "metadata": candidate.get("metadata", {})
     }
-    upsert_item(item_data)
-    user_item_data = {
-        "uuid": user_profile["uuid"],
-        "item_id": item_data["item_id"],
-        "status": "candidate"
-    }
-    upsert_user_item(user_item_data)
+upsert_items_bulk(list(items_payload.values()))
+upsert_user_items_bulk([
+    {"uuid": user_profile["uuid"], "item_id": item_id, "status": "candidate"}
+    for item_id in items_payload
+])
 
 # Step 4: 主推荐-反馈-更新循环
 current_embedding = user_embedding
@@ -67,25 +75,36 @@ seen_urls = set()
 running = True
 feedback_count = 0
 
+# Stack the pool's embeddings into one float32 matrix up front; each round scores the
+# rows not yet shown with a single matrix-vector product
+ranked_pool = [c for c in top_candidates if 'embedding' in c]
+pool_matrix = np.ascontiguousarray([c['embedding'] for c in ranked_pool], dtype=np.float32)
+# The matrix is now the only copy of the vectors; rows line up with ranked_pool
+for c in ranked_pool:
+    del c['embedding']
+remaining = np.arange(len(ranked_pool))
+
 # For sample generation, we'll simulate some feedback automatically
 simulate_feedback = True  # Set to True for automatic sample generation
 
 while running:
     # 1. 用当前 user embedding 对剩余候选项计算相似度，排序
-    candidates_to_rank = [c for c in top_candidates if c.get('source_url') not in seen_urls and 'embedding' in c]
-    if not candidates_to_rank:
+    remaining = np.array([i for i in remaining if ranked_pool[i].get('source_url') not in seen_urls], dtype=int)
+    if remaining.size == 0:
         print("\n--- You've seen all available recommendations. ---")
         break
-    candidate_embeddings = [c['embedding'] for c in candidates_to_rank]
-    similarities = cosine_similarity([current_embedding], candidate_embeddings)[0]
-    for i, c in enumerate(candidates_to_rank):
-        c['score'] = similarities[i]
-    sorted_candidates = sorted(candidates_to_rank, key=lambda x: x.get('score', 0), reverse=True)
+    # Embeddings are stored unit-length, so the dot product is the cosine similarity
+    similarities = pool_matrix[remaining] @ np.asarray(current_embedding, dtype=np.float32)
 
     # 2. 取前5个未展示过的推荐项
-    batch = sorted_candidates[:5]
-    if not batch:
-        break
+    # argpartition finds the top 5 without sorting the whole pool; only those 5 are ordered
+    k = min(5, remaining.size)
+    top = np.argpartition(-similarities, k - 1)[:k]
+    top = top[np.argsort(-similarities[top], kind='stable')]
+    batch_rows = remaining[top]
+    batch = [ranked_pool[i] for i in batch_rows]
+    for c, score in zip(batch, similarities[top]):
+        c['score'] = float(score)
 
     # 3. 展示5个推荐项，收集用户反馈（r/l/q）
     batch_feedback = []
@@ -131,7 +150,7 @@ while running:
         break
 
     # 4. 用这5个反馈更新 user embedding，提升个性化
-    batch_embeddings = [c['embedding'] for c in batch[:len(batch_feedback)]]
+    batch_embeddings = pool_matrix[batch_rows[:len(batch_feedback)]]
     current_embedding = update_user_embedding(current_embedding, batch_feedback, batch_embeddings)
     
     # 5. 更新用户配置文件
@@ -151,13 +170,15 @@ while running:
 print("\n=================================================")
 print("--- Interaction ended. Here is your final personalized journey. ---")
 final_output = format_for_user([c for c in top_candidates if c.get('source_url') in seen_urls])
-print(json.dumps(final_output, indent=2))
+# Serialize once with orjson and reuse the bytes for both the console and the plan agent's input file
+final_json = orjson.dumps(final_output, option=orjson.OPT_INDENT_2)
+print(final_json.decode())
 
 # Save the final output to plan_agent/ranked_candidates_sample.json
 output_path = "../plan_agent/ranked_candidates_sample.json"
 try:
-    with open(output_path, 'w') as f:
-        json.dump(final_output, f, indent=2)
+    with open(output_path, 'wb') as f:
+        f.write(final_json)
     print(f"--- Final recommendations saved to {output_path} ---")
 except Exception as e:
     print(f"--- Error saving to {output_path}: {e} ---")
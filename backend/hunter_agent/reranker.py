@@ -1,7 +1,6 @@
 # tools/reranker.py
 import numpy as np
 from typing import List, Dict
-from sklearn.metrics.pairwise import cosine_similarity
 
 def update_user_embedding(user_embedding: List[float], feedback: List[int], candidate_embeddings: List[List[float]]) -> List[float]:
     """
@@ -9,12 +8,12 @@ def update_user_embedding(user_embedding: List[float], feedback: List[int], cand
     feedback: list of 1 (like) or 0 (dislike)
     candidate_embeddings: list of embeddings corresponding to candidates
     """
-    user_vector = np.array(user_embedding)
-    for i, signal in enumerate(feedback):
-        if signal == 1:
-            user_vector += 0.1 * np.array(candidate_embeddings[i])  # reinforce
-        elif signal == 0:
-            user_vector -= 0.05 * np.array(candidate_embeddings[i])  # discourage
+    user_vector = np.array(user_embedding, dtype=np.float32)
+    if feedback:
+        signals = np.asarray(feedback)
+        # +0.1 reinforces a like, -0.05 discourages a dislike; the whole batch is one vector-matrix product
+        weights = np.where(signals == 1, 0.1, np.where(signals == 0, -0.05, 0.0)).astype(np.float32)
+        user_vector += weights @ np.asarray(candidate_embeddings[:len(feedback)], dtype=np.float32)
     return (user_vector / np.linalg.norm(user_vector)).tolist()
 
 def rerank_candidates(user_embedding: List[float], candidates: List[Dict], feedback: List[int]) -> List[Dict]:
@@ -23,10 +22,9 @@ def rerank_candidates(user_embedding: List[float], candidates: List[Dict], feedb
     Each candidate should contain 'embedding' key.
     """
     updated_embedding = update_user_embedding(user_embedding, feedback, [c['embedding'] for c in candidates])
-    similarities = cosine_similarity([updated_embedding], [c['embedding'] for c in candidates])[0]
+    # Candidate and user embeddings are unit-length, so cosine similarity is a single matrix-vector product
+    similarities = np.asarray([c['embedding'] for c in candidates], dtype=np.float32) @ np.asarray(updated_embedding, dtype=np.float32)
     
-    # Attach scores and sort
-    for i, c in enumerate(candidates):
-        c['score'] = similarities[i]
-    
-    return sorted(candidates, key=lambda x: x['score'], reverse=True) 
\ No newline at end of file
+    # Order by one stable argsort instead of a Python-keyed sort; ties keep their input order,
+    # as with sorted(..., reverse=True). Scores go on copies so the caller's dicts are untouched.
+    return [dict(candidates[i], score=float(similarities[i])) for i in np.argsort(-similarities, kind='stable')] 
\ No newline at end of file
@@ -1,10 +1,11 @@
 # tools/retriever.py
 import os
+import re
 import json
 import requests
 import base64
 from dotenv import load_dotenv  # pip install python-dotenv
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
 from backend.db.supabase_client import get_user_profile
 
@@ -131,10 +132,10 @@ def build_query(category: str, profile: dict) -> str:
         
         return query
 
-def search_openlibrary(query: str, num_results: int = 10) -> List[Dict]:
+def search_openlibrary(query: str, num_results: int = 10, session: Optional[requests.Session] = None) -> List[Dict]:
     url = "https://openlibrary.org/search.json"
     params = {"q": query, "limit": num_results}
-    response = requests.get(url, params=params)
+    response = (session or requests).get(url, params=params)
     if response.status_code == 200:
         data = response.json()
         results = []
@@ -162,71 +163,90 @@ def search_openlibrary(query: str, num_results: int = 10) -> List[Dict]:
         print(f"[OpenLibrary] Error: {response.status_code}")
         return []
 
-def search_google(query: str, num_results: int = 10, category: str = "general") -> List[Dict]:
+# --- Web search (SerpAPI) query and filter tables, built once at import ---
+# High-quality sites for different categories
+QUALITY_SITES = {
+    "art": (
+        "artsy.net", "artnet.com", "theartstory.org", "tate.org.uk", 
+        "moma.org", "metmuseum.org", "guggenheim.org", "whitney.org",
+        "saatchiart.com", "artforum.com", "hyperallergic.com",
+        "artnews.com", "artspace.com", "artbasel.com", "frieze.com",
+        "contemporaryartdaily.com", "e-flux.com", "art-agenda.com"
+    ),
+    "poetry": (
+        "poetryfoundation.org", "poets.org", "poetryarchive.org", 
+        "poetrysociety.org.uk", "poetryinternational.org", "poetry.com",
+        "poetryoutloud.org", "poetryproject.org", "poetrymagazine.org",
+        "poetrysociety.org", "poetrylondon.co.uk", "poetryireland.ie",
+        "poetrynz.org.nz", "poetry.org.au", "poetrycanada.ca"
+    ),
+    "musicals": (
+        "broadway.com", "playbill.com", "broadwayworld.com", 
+        "tonyawards.com", "musicalschwartz.com", "mtishows.com",
+        "rnh.com", "broadwayleague.com", "newyorktheatreguide.com",
+        "londontheatre.co.uk", "whatsonstage.com", "theatremonkey.com",
+        "westendtheatre.com", "musicaltheatreinternational.com"
+    ),
+    "podcasts": (
+        "spotify.com", "apple.com", "npr.org", "bbc.co.uk", 
+        "radiolab.org", "thisamericanlife.org", "ted.com",
+        "wondery.com", "gimletmedia.com", "serialpodcast.org",
+        "gimletmedia.com", "earwolf.com", "maximumfun.org",
+        "stitcher.com", "audible.com", "anchor.fm"
+    )
+}
+
+# Category-specific keywords added to the query
+CATEGORY_KEYWORDS = {
+    "art": "contemporary art exhibitions galleries museums artists",
+    "poetry": "contemporary poetry poets poems literary",
+    "musicals": "musical theatre Broadway West End stage",
+    "podcasts": "podcast audio storytelling radio"
+}
+
+# Negative keywords to filter out low-quality sites and non-content pages
+NEGATIVE_KEYWORDS = (
+    "-site:quora.com", "-site:reddit.com", "-site:youtube.com",
+    "-site:facebook.com", "-site:twitter.com", "-site:instagram.com",
+    "-site:linkedin.com", "-site:pinterest.com", "-site:tumblr.com",
+    "-site:wikipedia.org", "-site:answers.com", "-site:yahoo.com",
+    "-site:ask.com", "-site:stackoverflow.com", "-site:medium.com",
+    "-sitemap", "-site:map", "-site-map", "-sitemap.xml", "-robots.txt",
+    "-privacy", "-terms", "-contact", "-about", "-help", "-faq"
+)
+
+# Result filters: links on these domains, and titles containing these words, are skipped
+LOW_QUALITY_DOMAINS = (
+    "quora.com", "reddit.com", "youtube.com", "facebook.com",
+    "twitter.com", "instagram.com", "linkedin.com", "pinterest.com",
+    "tumblr.com", "wikipedia.org", "answers.com", "yahoo.com",
+    "ask.com", "stackoverflow.com", "medium.com", "blogspot.com",
+    "wordpress.com", "weebly.com", "squarespace.com"
+)
+UNWANTED_TITLE_KEYWORDS = ("quora", "reddit", "youtube", "facebook", "twitter")
+SITEMAP_TITLE_KEYWORDS = ("sitemap", "site map", "site-map", "robots.txt", "privacy", "terms", "contact", "about", "help", "faq")
+
+_SITE_FILTERS = {category: " OR ".join(f"site:{site}" for site in sites) for category, sites in QUALITY_SITES.items()}
+_QUALITY_SITE_SETS = {category: frozenset(sites) for category, sites in QUALITY_SITES.items()}
+_NEGATIVE_QUERY = " ".join(NEGATIVE_KEYWORDS)
+# Substring matches, as before, but each filter is one compiled scan instead of a loop of `in` checks
+_LOW_QUALITY_DOMAIN_RE = re.compile("|".join(map(re.escape, LOW_QUALITY_DOMAINS)))
+_UNWANTED_TITLE_RE = re.compile("|".join(map(re.escape, UNWANTED_TITLE_KEYWORDS + SITEMAP_TITLE_KEYWORDS)))
+
+def search_google(query: str, num_results: int = 10, category: str = "general", session: Optional[requests.Session] = None) -> List[Dict]:
     url = "https://serpapi.com/search.json"
     
-    # Define high-quality sites for different categories
-    quality_sites = {
-        "art": [
-            "artsy.net", "artnet.com", "theartstory.org", "tate.org.uk", 
-            "moma.org", "metmuseum.org", "guggenheim.org", "whitney.org",
-            "saatchiart.com", "artforum.com", "hyperallergic.com",
-            "artnews.com", "artspace.com", "artbasel.com", "frieze.com",
-            "contemporaryartdaily.com", "e-flux.com", "art-agenda.com"
-        ],
-        "poetry": [
-            "poetryfoundation.org", "poets.org", "poetryarchive.org", 
-            "poetrysociety.org.uk", "poetryinternational.org", "poetry.com",
-            "poetryoutloud.org", "poetryproject.org", "poetrymagazine.org",
-            "poetrysociety.org", "poetrylondon.co.uk", "poetryireland.ie",
-            "poetrynz.org.nz", "poetry.org.au", "poetrycanada.ca"
-        ],
-        "musicals": [
-            "broadway.com", "playbill.com", "broadwayworld.com", 
-            "tonyawards.com", "musicalschwartz.com", "mtishows.com",
-            "rnh.com", "broadwayleague.com", "newyorktheatreguide.com",
-            "londontheatre.co.uk", "whatsonstage.com", "theatremonkey.com",
-            "westendtheatre.com", "musicaltheatreinternational.com"
-        ],
-        "podcasts": [
-            "spotify.com", "apple.com", "npr.org", "bbc.co.uk", 
-            "radiolab.org", "thisamericanlife.org", "ted.com",
-            "wondery.com", "gimletmedia.com", "serialpodcast.org",
-            "gimletmedia.com", "earwolf.com", "maximumfun.org",
-            "stitcher.com", "audible.com", "anchor.fm"
-        ]
-    }
-    
-    # Enhanced query construction with category-specific keywords
-    category_keywords = {
-        "art": "contemporary art exhibitions galleries museums artists",
-        "poetry": "contemporary poetry poets poems literary",
-        "musicals": "musical theatre Broadway West End stage",
-        "podcasts": "podcast audio storytelling radio"
-    }
-    
     # Build enhanced query with site restrictions and category keywords
-    sites = quality_sites.get(category, [])
-    category_kw = category_keywords.get(category, "")
+    site_filter = _SITE_FILTERS.get(category)
+    category_kw = CATEGORY_KEYWORDS.get(category, "")
     
-    if sites:
-        site_filter = " OR ".join([f"site:{site}" for site in sites])
+    if site_filter:
         enhanced_query = f"({query}) ({category_kw}) ({site_filter})"
     else:
         enhanced_query = f"({query}) ({category_kw})"
     
     # Add negative keywords to filter out low-quality sites and non-content pages
-    negative_keywords = [
-        "-site:quora.com", "-site:reddit.com", "-site:youtube.com",
-        "-site:facebook.com", "-site:twitter.com", "-site:instagram.com",
-        "-site:linkedin.com", "-site:pinterest.com", "-site:tumblr.com",
-        "-site:wikipedia.org", "-site:answers.com", "-site:yahoo.com",
-        "-site:ask.com", "-site:stackoverflow.com", "-site:medium.com",
-        "-sitemap", "-site:map", "-site-map", "-sitemap.xml", "-robots.txt",
-        "-privacy", "-terms", "-contact", "-about", "-help", "-faq"
-    ]
-    
-    final_query = f"{enhanced_query} {' '.join(negative_keywords)}"
+    final_query = f"{enhanced_query} {_NEGATIVE_QUERY}"
     
     params = {
         "q": final_query,
@@ -238,44 +258,34 @@ def search_google(query: str, num_results: int = 10, category: str = "general")
         "sort": "relevance"  # Sort by relevance
     }
     
-    response = requests.get(url, params=params)
+    response = (session or requests).get(url, params=params)
     if response.status_code == 200:
         data = response.json()
         results = []
+        quality_sites = _QUALITY_SITE_SETS.get(category, frozenset())
         
         for item in data.get("organic_results", []):
             link = item.get("link", "")
             title = item.get("title", "")
             description = item.get("snippet", "")
             
-            # Skip low-quality sites
-            low_quality_domains = [
-                "quora.com", "reddit.com", "youtube.com", "facebook.com",
-                "twitter.com", "instagram.com", "linkedin.com", "pinterest.com",
-                "tumblr.com", "wikipedia.org", "answers.com", "yahoo.com",
-                "ask.com", "stackoverflow.com", "medium.com", "blogspot.com",
-                "wordpress.com", "weebly.com", "squarespace.com"
-            ]
+            link_lower = link.lower()
+            title_lower = title.lower()
             
-            if any(domain in link.lower() for domain in low_quality_domains):
+            # Skip low-quality sites
+            if _LOW_QUALITY_DOMAIN_RE.search(link_lower):
                 continue
             
             # Skip if title or description is too short
             if len(title) < 10 or len(description) < 20:
                 continue
             
-            # Skip if title contains unwanted keywords
-            unwanted_keywords = ["quora", "reddit", "youtube", "facebook", "twitter"]
-            if any(keyword in title.lower() for keyword in unwanted_keywords):
-                continue
-            
-            # Skip sitemaps and other non-content pages
-            sitemap_keywords = ["sitemap", "site map", "site-map", "robots.txt", "privacy", "terms", "contact", "about", "help", "faq"]
-            if any(keyword in title.lower() for keyword in sitemap_keywords):
+            # Skip titles with unwanted keywords, sitemaps and other non-content pages
+            if _UNWANTED_TITLE_RE.search(title_lower):
                 continue
             
             # Skip if URL contains sitemap patterns (but be less strict)
-            if "/sitemap" in link.lower() and "sitemap" in title.lower():
+            if "/sitemap" in link_lower and "sitemap" in title_lower:
                 continue
             
             # Extract domain for metadata
@@ -301,7 +311,7 @@ def search_google(query: str, num_results: int = 10, category: str = "general")
                     "rating": str(item.get("rating") or ""),
                     "mood": item.get("mood") or "",
                     "domain": domain,
-                    "quality_score": "high" if domain in sites else "medium"
+                    "quality_score": "high" if domain in quality_sites else "medium"
                 }
             })
             
@@ -314,7 +324,7 @@ def search_google(query: str, num_results: int = 10, category: str = "general")
         print(f"[SerpAPI] Error: {response.status_code}")
         return []
 
-def search_tmdb(query: str, num_results: int = 10) -> List[Dict]:
+def search_tmdb(query: str, num_results: int = 10, session: Optional[requests.Session] = None) -> List[Dict]:
     url = "https://api.themoviedb.org/3/search/movie"
     params = {
         "api_key": TMDB_API_KEY,
@@ -323,7 +333,7 @@ def search_tmdb(query: str, num_results: int = 10) -> List[Dict]:
         "page": 1,
         "include_adult": False
     }
-    response = requests.get(url, params=params)
+    response = (session or requests).get(url, params=params)
     if response.status_code == 200:
         data = response.json()
         results = []
@@ -351,7 +361,7 @@ def search_tmdb(query: str, num_results: int = 10) -> List[Dict]:
         print(f"[TMDB] Error: {response.status_code}")
         return []
 
-def get_spotify_access_token() -> str:
+def get_spotify_access_token(session: Optional[requests.Session] = None) -> str:
     auth_str = f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}"
     b64_auth_str = base64.b64encode(auth_str.encode()).decode()
     headers = {
@@ -359,20 +369,20 @@ def get_spotify_access_token() -> str:
         "Content-Type": "application/x-www-form-urlencoded"
     }
     data = {"grant_type": "client_credentials"}
-    response = requests.post("https://accounts.spotify.com/api/token", headers=headers, data=data)
+    response = (session or requests).post("https://accounts.spotify.com/api/token", headers=headers, data=data)
     if response.status_code == 200:
         return response.json()["access_token"]
     else:
         print(f"[Spotify] Token Error: {response.status_code}", response.text)
         return ""
 
-def search_spotify(query: str, num_results: int = 10) -> List[Dict]:
-    token = get_spotify_access_token()
+def search_spotify(query: str, num_results: int = 10, session: Optional[requests.Session] = None) -> List[Dict]:
+    token = get_spotify_access_token(session)
     if not token:
         return []
     headers = {"Authorization": f"Bearer {token}"}
     params = {"q": query, "type": "track", "limit": num_results}
-    response = requests.get("https://api.spotify.com/v1/search", headers=headers, params=params)
+    response = (session or requests).get("https://api.spotify.com/v1/search", headers=headers, params=params)
     if response.status_code == 200:
         data = response.json()
         results = []
@@ -402,25 +412,29 @@ def search_spotify(query: str, num_results: int = 10) -> List[Dict]:
         print(f"[Spotify] Search Error: {response.status_code}", response.text)
         return []
 
-def retrieve_top_candidates(category: str, user_embedding: List[float], user_profile: dict) -> List[Dict]:
+def retrieve_top_candidates(category: str, user_embedding: List[float], user_profile: dict, session: Optional[requests.Session] = None) -> List[Dict]:
+    """
+    Retrieve candidates for one category.
+    Pass a shared requests.Session to reuse keep-alive connections across calls.
+    """
     query = build_query(category, user_profile)
     # Select the appropriate data source for each category
     if category == "books":
-        results = search_openlibrary(query, num_results=20)
+        results = search_openlibrary(query, num_results=20, session=session)
     elif category == "movies":
-        results = search_tmdb(query, num_results=20)
+        results = search_tmdb(query, num_results=20, session=session)
     elif category == "musicals":
-        results = search_google(query, num_results=20, category="musicals")
+        results = search_google(query, num_results=20, category="musicals", session=session)
     elif category == "music":
-        results = search_spotify(query, num_results=20)
+        results = search_spotify(query, num_results=20, session=session)
     elif category == "art":
-        results = search_google(query, num_results=20, category="art")
+        results = search_google(query, num_results=20, category="art", session=session)
     elif category == "poetry":
-        results = search_google(query, num_results=20, category="poetry")
+        results = search_google(query, num_results=20, category="poetry", session=session)
     elif category == "podcasts":
-        results = search_google(query, num_results=20, category="podcasts")
+        results = search_google(query, num_results=20, category="podcasts", session=session)
     else:
-        results = search_google(query, num_results=10, category="general")
+        results = search_google(query, num_results=10, category="general", session=session)
     # Deduplicate results by title + source_url
     seen = set()
     unique_results = []
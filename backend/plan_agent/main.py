@@ -1,13 +1,22 @@
 import json
 import math
-import random
+import os
+import functools
+import orjson
 from typing import List, Dict
 
+@functools.lru_cache(maxsize=32)
+def _read_ranked_candidates(path: str, mtime_ns: int) -> List[Dict]:
+    """Parse a candidates file; cached per (path, mtime) so an unchanged file is parsed once."""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
 def load_ranked_candidates(path="ranked_candidates_sample.json"):
     """Loads the list of ranked candidates from a JSON file."""
     try:
-        with open(path, 'r') as f:
-            return json.load(f)
+        candidates = _read_ranked_candidates(path, os.stat(path).st_mtime_ns)
+        # Hand out fresh dicts: plan display and curation annotate items in place
+        return [dict(candidate) for candidate in candidates]
     except FileNotFoundError: 
         print(f"Error: Could not find the file at {path}")
         return []
@@ -15,28 +24,32 @@ def load_ranked_candidates(path="ranked_candidates_sample.json"):
         print(f"Error: Could not decode the JSON file at {path}")
         return []
 
+# Time commitment per media type (in hours)
+MEDIA_TIME_ESTIMATES = {
+    "movie": 2,           # Average movie length 
+    "book": 8,            # Weekly reading time (1 hour/day)
+    "music": 1,           # Album listening session 
+    "art": 3,             # Museum/exhibition visit 
+    "poetry": 2,          # Poetry reading session 
+    "musicals": 3,        # Musical performance 
+    "podcasts": 1,        # Podcast episode 
+    "web": 1              # Web content browsing 
+}
+
+# Weekly media time budget per effort level (in hours)
+EFFORT_LEVEL_BUDGETS = {
+    "chill": 6,      # 6 hours per week - relaxed pace
+    "medium": 12,    # 12 hours per week - balanced pace
+    "intense": 18    # 18 hours per week - intensive pace
+}
+
 def get_media_time_estimate(item_type: str) -> int:
     """Estimate time commitment for different media types (in hours)."""
-    time_estimates = {
-        "movie": 2,           # Average movie length 
-        "book": 8,            # Weekly reading time (1 hour/day)
-        "music": 1,           # Album listening session 
-        "art": 3,             # Museum/exhibition visit 
-        "poetry": 2,          # Poetry reading session 
-        "musicals": 3,        # Musical performance 
-        "podcasts": 1,        # Podcast episode 
-        "web": 1              # Web content browsing 
-    }
-    return time_estimates.get(item_type.lower(), 1)
+    return MEDIA_TIME_ESTIMATES.get(item_type.lower(), 1)
 
 def calculate_weekly_time_budget(effort_level: str = "medium") -> int:
     """Calculate reasonable weekly time budget for media consumption (in hours)."""
-    effort_levels = {
-        "chill": 6,      # 6 hours per week - relaxed pace
-        "medium": 12,    # 12 hours per week - balanced pace
-        "intense": 18    # 18 hours per week - intensive pace
-    }
-    return effort_levels.get(effort_level.lower(), 12)
+    return EFFORT_LEVEL_BUDGETS.get(effort_level.lower(), 12)
 
 def get_plan_duration_weeks(duration_months: int) -> int:
     """Convert months to weeks."""
@@ -105,12 +118,19 @@ def generate_smart_weekly_plan(candidates: List[Dict], num_weeks: int = 12, effo
     
     # Sort candidates by score (highest first)
     sorted_candidates = sorted(candidates, key=lambda x: x.get('score', 0), reverse=True)
+    # Each candidate's type, time and score never change, so derive them once rather than on
+    # every selection pass; this list is kept index-aligned with sorted_candidates.
+    candidate_facts = []
+    for item in sorted_candidates:
+        item_type = item.get('type', 'unknown').lower()
+        candidate_facts.append((item_type, get_media_time_estimate(item_type), item.get('score', 0)))
     
     weekly_plan = {}
     weekly_time_budget = calculate_weekly_time_budget(effort_level)
     
     # Track what's been assigned to avoid repetition
     assigned_items = []
+    assigned_time = 0  # Running total of hours already scheduled
     weekly_type_counts = {}  # Track media types per week
     
     # Calculate total available time and target items per week
@@ -136,8 +156,7 @@ def generate_smart_weekly_plan(candidates: List[Dict], num_weeks: int = 12, effo
             if target_remaining_items_per_week > 1:
                 # If we need to fit more items, be more conservative with time
                 adjusted_budget = min(weekly_time_budget, 
-                                    (total_available_time - sum(get_media_time_estimate(item.get('type', '')) 
-                                     for item in assigned_items)) / remaining_weeks)
+                                    (total_available_time - assigned_time) / remaining_weeks)
             else:
                 # If we have fewer items, we can be more generous
                 adjusted_budget = weekly_time_budget
@@ -159,9 +178,7 @@ def generate_smart_weekly_plan(candidates: List[Dict], num_weeks: int = 12, effo
             for i, item in enumerate(sorted_candidates):
                 if item in assigned_items:
                     continue
-                    
-                item_type = item.get('type', 'unknown').lower()
-                item_time = get_media_time_estimate(item_type)
+                item_type, item_time, item_score = candidate_facts[i]
                 
                 # Check if item fits in time budget
                 if current_week_time + item_time > adjusted_budget:
@@ -173,7 +190,7 @@ def generate_smart_weekly_plan(candidates: List[Dict], num_weeks: int = 12, effo
                     diversity_penalty = weekly_type_counts[week][item_type] * 0.15
                 
                 # Calculate final score (original score - diversity penalty)
-                final_score = item.get('score', 0) - diversity_penalty
+                final_score = item_score - diversity_penalty
                 
                 if final_score > best_score:
                     best_score = final_score
@@ -182,11 +199,12 @@ def generate_smart_weekly_plan(candidates: List[Dict], num_weeks: int = 12, effo
             # Add the best item to this week
             if best_item:
                 index, item = best_item
-                item_type = item.get('type', 'unknown').lower()
+                item_type, item_time, _ = candidate_facts[index]
                 
                 weekly_plan[f"Week {week}"].append(item)
                 assigned_items.append(item)
-                current_week_time += get_media_time_estimate(item_type)
+                current_week_time += item_time
+                assigned_time += item_time
                 items_added_this_week += 1
                 
                 # Update type counts
@@ -194,6 +212,7 @@ def generate_smart_weekly_plan(candidates: List[Dict], num_weeks: int = 12, effo
                 
                 # Remove from candidates
                 sorted_candidates.pop(index)
+                candidate_facts.pop(index)
             else:
                 break
     
@@ -242,18 +261,28 @@ def display_plan(plan, effort_level="medium"):
     print(f"Average per week: {total_time/len(plan):.1f}h")
     print(f"Effort level: {effort_level.title()}")
 
+def summarize_plan(plan: Dict) -> Dict:
+    """Collect a plan's items, total hours and per-type counts in a single traversal."""
+    all_items = []
+    total_time = 0
+    type_counts = {}
+    for week_items in plan.values():
+        for item in week_items:
+            all_items.append(item)
+            total_time += get_media_time_estimate(item.get('type', ''))
+            item_type = item.get('type', 'unknown').lower()
+            type_counts[item_type] = type_counts.get(item_type, 0) + 1
+    return {"items": all_items, "total_time": total_time, "type_counts": type_counts}
+
 def analyze_plan_diversity(plan):
     """Analyze the diversity of the generated plan."""
     print("\n" + "="*40)
     print("PLAN DIVERSITY ANALYSIS")
     print("="*40)
     
-    all_items = [item for week_items in plan.values() for item in week_items]
-    type_counts = {}
-    
-    for item in all_items:
-        item_type = item.get('type', 'unknown').lower()
-        type_counts[item_type] = type_counts.get(item_type, 0) + 1
+    summary = summarize_plan(plan)
+    all_items = summary["items"]
+    type_counts = summary["type_counts"]
     
     print("Media type distribution:")
     for media_type, count in sorted(type_counts.items(), key=lambda x: x[1], reverse=True):
@@ -339,8 +368,9 @@ def manual_curation_loop(plan, effort_level="medium"):
 def save_final_plan(plan, filename="final_media_plan.json"):
     """Save the final plan to a JSON file."""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(plan, f, indent=2, ensure_ascii=False)
+        # orjson emits UTF-8 directly, matching the previous ensure_ascii=False output
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(plan, option=orjson.OPT_INDENT_2))
         print(f"Final plan saved to {filename}")
         return True
     except Exception as e:
@@ -353,8 +383,9 @@ def display_final_summary(plan):
     print(" " * 20 + "FINAL PLAN SUMMARY")
     print("="*70)
     
-    all_items = [item for week_items in plan.values() for item in week_items]
-    total_time = sum(get_media_time_estimate(item.get('type', '')) for item in all_items)
+    summary = summarize_plan(plan)
+    all_items = summary["items"]
+    total_time = summary["total_time"]
     
     print(f"\nPLAN STATISTICS:")
     print(f"   Total items: {len(all_items)}")
@@ -363,10 +394,7 @@ def display_final_summary(plan):
     print(f"   Average per week: {total_time/len(plan):.1f} hours")
     
     # Type breakdown
-    type_counts = {}
-    for item in all_items:
-        item_type = item.get('type', 'unknown').lower()
-        type_counts[item_type] = type_counts.get(item_type, 0) + 1
+    type_counts = summary["type_counts"]
     
     print(f"\nMEDIA TYPE BREAKDOWN:")
     for media_type, count in sorted(type_counts.items(), key=lambda x: x[1], reverse=True):
@@ -389,8 +417,9 @@ def user_final_confirmation(plan):
     print("="*60)
     
     # Show a condensed version of the plan
-    all_items = [item for week_items in plan.values() for item in week_items]
-    total_time = sum(get_media_time_estimate(item.get('type', '')) for item in all_items)
+    summary = summarize_plan(plan)
+    all_items = summary["items"]
+    total_time = summary["total_time"]
     
     print(f"\nYour plan includes {len(all_items)} items over {len(plan)} weeks")
     print(f"Total time commitment: {total_time} hours ({total_time/len(plan):.1f}h/week)")
@@ -694,8 +723,9 @@ def demo_different_plans():
         plan = generate_smart_weekly_plan(candidates, num_weeks, effort_level)
         
         # Show statistics
-        all_items = [item for week_items in plan.values() for item in week_items]
-        total_time = sum(get_media_time_estimate(item.get('type', '')) for item in all_items)
+        summary = summarize_plan(plan)
+        all_items = summary["items"]
+        total_time = summary["total_time"]
         
         print(f"\nPlan Statistics:")
         print(f"   Items included: {len(all_items)}")
@@ -130,7 +130,6 @@ Rules:
             yield from self._ask_llm_until_text(chat_messages, user_uuid, session_id)
             
         except Exception as e:
-            import traceback
             error_traceback = traceback.format_exc()
             print(f"ERROR in chat_stream: {str(e)}")
             print(f"TRACEBACK: {error_traceback}")
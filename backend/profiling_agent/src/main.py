@@ -1,7 +1,7 @@
 import os
 from typing import List, Dict, Any
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -16,7 +16,7 @@ except ImportError:
 # Load environment variables from .env in the root folder
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
 
-app = FastAPI(title="Profiling Agent MCP Server", version="1.0.0")
+app = FastAPI(title="Profiling Agent MCP Server", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -1,21 +1,38 @@
 import json
 import os
+import orjson
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
+from collections import OrderedDict
 import hashlib
+import threading
 from backend.db.supabase_client import upsert_user_profile
 import requests
 
 class ConversationStorage:
     """Handles local JSON storage for conversation history."""
+
+    # Parsed conversations kept in memory, least recently used evicted first
+    MAX_CACHED_CONVERSATIONS = 1024
     
     def __init__(self, conversations_dir: str = "conversations"):
         if conversations_dir is None:
             conversations_dir = ""
         self.conversations_dir = Path(conversations_dir)
         self.conversations_dir.mkdir(exist_ok=True)
+        # session_id -> (file mtime_ns, parsed conversation); an unchanged file is not re-parsed
+        self._conversations: "OrderedDict[str, tuple]" = OrderedDict()
+        # The event loop and the threadpool running /chat's sync generator both touch the cache
+        self._conversations_lock = threading.Lock()
+
+    def _remember(self, session_id: str, mtime_ns: int, conversation: Dict[str, Any]) -> None:
+        with self._conversations_lock:
+            self._conversations[session_id] = (mtime_ns, conversation)
+            self._conversations.move_to_end(session_id)
+            if len(self._conversations) > self.MAX_CACHED_CONVERSATIONS:
+                self._conversations.popitem(last=False)
     
     def save_conversation(self, session_id: str, messages: List[Dict[str, str]], user_uuid: str = None) -> bool:
         """Save conversation history to JSON file."""
@@ -30,8 +47,11 @@ class ConversationStorage:
         }
         try:
             conversation_path = self.conversations_dir / f"{session_id}.json"
-            with open(conversation_path, 'w') as f:
-                json.dump(conversation, f, indent=2)
+            with open(conversation_path, 'wb') as f:
+                f.write(orjson.dumps(conversation, option=orjson.OPT_INDENT_2))
+            # The next load of this session (e.g. the following append) can skip re-parsing
+            conversation["messages"] = list(messages)
+            self._remember(session_id, conversation_path.stat().st_mtime_ns, conversation)
             return True
         except (IOError, TypeError):
             return False
@@ -41,13 +61,29 @@ class ConversationStorage:
         if not session_id:
             return None
         conversation_path = self.conversations_dir / f"{session_id}.json"
-        if not conversation_path.exists():
-            return None
         try:
-            with open(conversation_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            mtime_ns = conversation_path.stat().st_mtime_ns
+        except OSError:
             return None
+        with self._conversations_lock:
+            cached = self._conversations.get(session_id)
+            hit = cached is not None and cached[0] == mtime_ns
+            if hit:
+                self._conversations.move_to_end(session_id)
+        if hit:
+            conversation = cached[1]
+        else:
+            try:
+                with open(conversation_path, 'rb') as f:
+                    conversation = orjson.loads(f.read())
+            except (json.JSONDecodeError, IOError):
+                return None
+            self._remember(session_id, mtime_ns, conversation)
+        # Callers append to the returned messages, so never hand out the cached list itself
+        conversation = dict(conversation)
+        if isinstance(conversation.get("messages"), list):
+            conversation["messages"] = list(conversation["messages"])
+        return conversation
     
     def get_messages(self, session_id: str) -> List[Dict[str, str]]:
         """Get just the messages from a conversation."""
@@ -85,6 +121,8 @@ class ConversationStorage:
         if not session_id:
             return False
         conversation_path = self.conversations_dir / f"{session_id}.json"
+        with self._conversations_lock:
+            self._conversations.pop(session_id, None)
         if conversation_path.exists():
             try:
                 conversation_path.unlink()
@@ -98,8 +136,8 @@ class ConversationStorage:
         sessions = []
         for file_path in self.conversations_dir.glob("*.json"):
             try:
-                with open(file_path, 'r') as f:
-                    conversation = json.load(f)
+                with open(file_path, 'rb') as f:
+                    conversation = orjson.loads(f.read())
                     sessions.append(conversation["session_id"])
             except (json.JSONDecodeError, IOError):
                 continue
@@ -110,8 +148,8 @@ class ConversationStorage:
         conversations = []
         for file_path in self.conversations_dir.glob("*.json"):
             try:
-                with open(file_path, 'r') as f:
-                    conversation = json.load(f)
+                with open(file_path, 'rb') as f:
+                    conversation = orjson.loads(f.read())
                     if conversation.get("user_uuid") == user_uuid:
                         conversations.append(conversation)
             except (json.JSONDecodeError, IOError):
@@ -126,6 +164,8 @@ class ProfileStorage:
             profiles_dir = ""
         self.profiles_dir = Path(profiles_dir)
         self.profiles_dir.mkdir(exist_ok=True)
+        # uuid -> profile file, so lookups don't re-glob and re-parse every profile on each request
+        self._profile_paths: Dict[str, Path] = {}
     
     def _generate_profile_filename(self, user_uuid: str) -> str:
         timestamp = int(datetime.utcnow().timestamp() * 1000)
@@ -157,14 +197,20 @@ class ProfileStorage:
     def _find_profile_file(self, user_uuid: str) -> Optional[Path]:
         if not user_uuid:
             return None
+        cached_path = self._profile_paths.get(user_uuid)
+        if cached_path is not None and cached_path.is_file():
+            return cached_path
+        # Cache miss (or the file was removed): scan once, indexing every profile seen on the way
         for file_path in self.profiles_dir.glob("*.json"):
             try:
-                with open(file_path, 'r') as f:
-                    profile = json.load(f)
+                with open(file_path, 'rb') as f:
+                    profile = orjson.loads(f.read())
+                    self._profile_paths[profile.get("uuid")] = file_path
                     if profile.get("uuid") == user_uuid:
                         return file_path
             except (json.JSONDecodeError, IOError):
                 continue
+        self._profile_paths.pop(user_uuid, None)
         return None
 
     def get_profile(self, user_uuid: str) -> Optional[Dict[str, Any]]:
@@ -175,8 +221,8 @@ class ProfileStorage:
         if not profile_path:
             return None
         try:
-            with open(profile_path, 'r') as f:
-                return json.load(f)
+            with open(profile_path, 'rb') as f:
+                return orjson.loads(f.read())
         except (json.JSONDecodeError, IOError):
             return None
     
@@ -233,16 +279,17 @@ class ProfileStorage:
             filename = self._generate_profile_filename(profile["uuid"])
             profile["filename"] = filename
         profile_path = self.profiles_dir / filename
-        with open(profile_path, 'w') as f:
-            json.dump(profile, f, indent=2)
+        with open(profile_path, 'wb') as f:
+            f.write(orjson.dumps(profile, option=orjson.OPT_INDENT_2))
+        self._profile_paths[profile["uuid"]] = profile_path
     
     def list_profiles(self) -> list:
         """List all profile UUIDs."""
         profiles = []
         for file_path in self.profiles_dir.glob("*.json"):
             try:
-                with open(file_path, 'r') as f:
-                    profile = json.load(f)
+                with open(file_path, 'rb') as f:
+                    profile = orjson.loads(f.read())
                     profiles.append(profile["uuid"])
             except (json.JSONDecodeError, IOError):
                 continue
@@ -35,6 +35,9 @@ const SwipeFlow: React.FC<SwipeFlowProps> = ({ userUuid }) => {
         const data = await res.json();
         if (data.status === 'complete') {
           setWaiting(false);
+        } else if (data.status === 'error') {
+          // Generation failed on the server; stop polling rather than waiting forever
+          setError('Hunter Agent could not generate recommendations. Please try again later.');
         } else {
           setWaiting(true);
           pollTimeout = setTimeout(pollStatus, POLL_INTERVAL);
@@ -101,9 +104,9 @@ const SwipeFlow: React.FC<SwipeFlowProps> = ({ userUuid }) => {
     setCurrent((prev) => prev + 1);
   };
 
+  if (error) return <div style={{ color: 'red' }}>Error: {error}</div>;
   if (waiting) return <div>Waiting for recommendations from Hunter Agent...</div>;
   if (loading) return <div>Loading candidates...</div>;
-  if (error) return <div style={{ color: 'red' }}>Error: {error}</div>;
   if (trainingComplete) return <div>Training complete! You have swiped right on 30 items. 🎉</div>;
   if (current >= candidates.length) return <div>No more candidates! 🎉</div>;
 